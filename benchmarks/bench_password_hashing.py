@@ -0,0 +1,111 @@
+"""
+Login latency under concurrent load, with and without moving password
+hashing off the gevent event loop.
+
+Each run drives POST /login through the Flask test client from a pool of
+greenlets while a probe greenlet measures event-loop lag (how late a 1 ms
+sleep wakes up), which is what every other request in the worker feels.
+
+    python benchmarks/bench_password_hashing.py --concurrency 20 --requests 200
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import gevent
+from gevent.pool import Pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from app import create_app, db, User  # noqa: E402
+
+PASSWORD = 'correct horse battery staple'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run(offload, concurrency, total, method):
+    database = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'PASSWORD_HASH_OFFLOAD': offload,
+        'PASSWORD_HASH_METHOD': method,
+        'RATELIMIT_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', phone='08000000000')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+    latencies, lag = [], []
+    running = True
+
+    def login(submitted):
+        # Timed from submission, so time spent waiting for the loop counts.
+        client = app.test_client()
+        response = client.post('/login', data={'identifier': 'bench', 'password': PASSWORD})
+        latencies.append(time.perf_counter() - submitted)
+        assert response.status_code == 302, response.status_code
+
+    def probe():
+        while running:
+            started = time.perf_counter()
+            gevent.sleep(0.001)
+            lag.append(time.perf_counter() - started - 0.001)
+
+    prober = gevent.spawn(probe)
+    started = time.perf_counter()
+    pool = Pool(concurrency)
+    for _ in range(total):
+        pool.spawn(login, time.perf_counter())
+    pool.join()
+    elapsed = time.perf_counter() - started
+    running = False
+    prober.join()
+
+    return {
+        'offload': offload,
+        'throughput_rps': total / elapsed,
+        'login_p50_ms': percentile(latencies, 50) * 1000,
+        'login_p95_ms': percentile(latencies, 95) * 1000,
+        'login_p99_ms': percentile(latencies, 99) * 1000,
+        'loop_lag_p99_ms': percentile(lag, 99) * 1000,
+        'loop_lag_max_ms': max(lag, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--method', default='scrypt:32768:8:1',
+                        help="werkzeug hash method to benchmark")
+    args = parser.parse_args()
+
+    print(f"{'offload':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'lag p99':>8} {'lag max':>8}")
+    for offload in (False, True):
+        result = run(offload, args.concurrency, args.requests, args.method)
+        print(f"{str(result['offload']):>8} {result['throughput_rps']:8.1f} "
+              f"{result['login_p50_ms']:8.1f} {result['login_p95_ms']:8.1f} "
+              f"{result['login_p99_ms']:8.1f} {result['loop_lag_p99_ms']:8.1f} "
+              f"{result['loop_lag_max_ms']:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
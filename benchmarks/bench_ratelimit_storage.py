@@ -0,0 +1,107 @@
+"""
+Per-check cost of the rate-limit storages, and whether a limit holds across
+worker processes.
+
+The overhead run times `FixedWindowRateLimiter.hit` against memory:// and
+the shared sqlite:// storage, spread over many client keys like real traffic.
+The correctness run forks several processes that all hammer one key through
+the same storage URI; with a limit of N, exactly N hits in total may pass.
+memory:// is included to show the per-worker over-admission it causes.
+
+    python benchmarks/bench_ratelimit_storage.py --checks 20000 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ratelimit_storage  # noqa: E402,F401  registers sqlite://
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def overhead(uri, checks, keys):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse('1000000 per hour')
+    samples = []
+    for i in range(checks):
+        started = time.perf_counter()
+        limiter.hit(item, 'bench', f'10.0.{i % keys // 256}.{i % 256}')
+        samples.append(time.perf_counter() - started)
+    return {
+        'checks_per_s': checks / sum(samples),
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+    }
+
+
+def _hammer(uri, limit, attempts, allowed):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse(f'{limit} per hour')
+    passed = sum(limiter.hit(item, 'login', '10.0.0.1') for _ in range(attempts))
+    with allowed.get_lock():
+        allowed.value += passed
+
+
+def shared_limit(uri, processes, limit, attempts):
+    context = multiprocessing.get_context('fork')
+    allowed = context.Value('i', 0)
+    workers = [context.Process(target=_hammer, args=(uri, limit, attempts, allowed))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return allowed.value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=5000,
+                        help="distinct client addresses to spread checks over")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--attempts', type=int, default=200,
+                        help="hits per process in the correctness run")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    uris = {
+        'memory': 'memory://',
+        'sqlite': f'sqlite:///{os.path.join(directory, "overhead.db")}',
+    }
+
+    print(f"{'storage':>8} {'checks/s':>10} {'p50 us':>8} {'p99 us':>8}")
+    for name, uri in uris.items():
+        result = overhead(uri, args.checks, args.keys)
+        print(f"{name:>8} {result['checks_per_s']:10.0f} "
+              f"{result['p50_us']:8.1f} {result['p99_us']:8.1f}")
+
+    print()
+    print(f"{args.processes} processes x {args.attempts} hits, limit {args.limit}:")
+    failed = False
+    for name, uri in (('memory', 'memory://'),
+                      ('sqlite', f'sqlite:///{os.path.join(directory, "shared.db")}')):
+        allowed = shared_limit(uri, args.processes, args.limit, args.attempts)
+        ok = allowed == args.limit
+        print(f"{name:>8} allowed {allowed:5d}  {'ok' if ok else 'OVER LIMIT'}")
+        failed = failed or (name == 'sqlite' and not ok)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Route-level latency, throughput and SQL-per-request, with a regression gate.
+
+Boots create_app() against a SQLite database loaded by `flask seed-fake`
+(cached between runs), then drives each route through the Flask test client
+from a fixed pool of threads, one client per thread. Signed-in routes log
+every thread in as its own seeded seller first.
+
+    python benchmarks/bench_routes.py --output results.json
+    python benchmarks/bench_routes.py --baseline baseline.json --tolerance 0.2
+
+With --baseline, the run exits 1 if any route's p95 latency or SQL queries
+per request rose, or its throughput fell, by more than the tolerance, or if
+any request failed.
+
+No baseline is committed: latency and throughput only compare on the same
+machine. Record one from the commit you are measuring against, then run
+your branch against it with the same options:
+
+    git stash  # or check out main
+    python benchmarks/bench_routes.py --output /tmp/baseline.json
+    git stash pop
+    python benchmarks/bench_routes.py --baseline /tmp/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask import g  # noqa: E402
+
+from app import create_app, db, Category, Listing, User  # noqa: E402
+
+PASSWORD = 'password'  # what seed-fake gives every seller
+SEARCH_TERMS = ('iphone', 'toyota', 'sofa', 'ankara', 'samsung', 'laptop', 'bed', 'nike')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_app(database, listings, users, seed, response_cache=True):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+        'RATELIMIT_ENABLED': False,
+        'CACHE_DIR': os.path.join(os.path.dirname(database), 'cache'),
+        # A zero byte budget means nothing is ever stored.
+        **({} if response_cache else {'RESPONSE_CACHE_MAX_BYTES': 0}),
+    })
+    if not os.path.exists(database):
+        with app.app_context():
+            db.create_all()
+        result = app.test_cli_runner().invoke(args=[
+            'seed-fake', '--users', str(users), '--listings', str(listings), '--seed', str(seed),
+        ])
+        if result.exit_code:
+            raise SystemExit(f"seed-fake failed:\n{result.output}")
+    return app
+
+
+def login(client, username):
+    response = client.post('/login', data={'identifier': username, 'password': PASSWORD})
+    assert response.status_code == 302, f"login as {username} failed ({response.status_code})"
+
+
+class Route:
+    """One benchmarked route: how to make the i-th request from a worker."""
+
+    def __init__(self, name, request, signed_in=False, fresh_client=False):
+        self.name = name
+        self.request = request
+        self.signed_in = signed_in
+        # A new cookie jar per request, for routes that change the session.
+        self.fresh_client = fresh_client
+
+
+def make_routes(app):
+    with app.app_context():
+        category_ids = [row.id for row in db.session.query(Category.id)]
+        sellers = [row.username for row in
+                   db.session.query(User.username).filter(User.username.like('seller%'))
+                   .order_by(User.id).limit(64)]
+    owned = {}
+
+    def owned_listing(worker):
+        # Each worker edits one of its own seller's listings.
+        if worker.username not in owned:
+            with app.app_context():
+                owned[worker.username] = db.session.query(Listing.id).join(User) \
+                    .filter(User.username == worker.username).limit(1).scalar()
+        return owned[worker.username]
+
+    def post_data(i):
+        return {'title': f'Benchmark phone {i}', 'price': '45,000', 'location': 'Ikeja',
+                'description': 'Posted by the route benchmark', 'phone': '08012345678',
+                'category_id': str(category_ids[i % len(category_ids)])}
+
+    routes = [
+        Route('home', lambda c, w, i: c.get('/')),
+        Route('search', lambda c, w, i: c.get(f'/?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}')),
+        Route('category', lambda c, w, i: c.get(f'/?category={category_ids[i % len(category_ids)]}')),
+        Route('home_signed_in', lambda c, w, i: c.get('/'), signed_in=True),
+        Route('login', lambda c, w, i: c.post('/login', data={
+            'identifier': sellers[i % len(sellers)], 'password': PASSWORD,
+        }), fresh_client=True),
+        Route('post', lambda c, w, i: c.post('/post', data=post_data(i)), signed_in=True),
+        Route('edit', lambda c, w, i: c.post(f'/edit/{owned_listing(w)}', data=dict(
+            post_data(i), title=f'Edited listing {i}',
+        )), signed_in=True),
+    ]
+    return routes, sellers
+
+
+def run_route(app, route, sellers, concurrency, total, query_counts):
+    local = threading.local()
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def worker_client():
+        if route.fresh_client:
+            local.username = None
+            return app.test_client()
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+            local.username = sellers[threading.get_ident() % len(sellers)]
+            if route.signed_in:
+                login(local.client, local.username)
+        return local.client
+
+    def one(i):
+        client = worker_client()  # signing in isn't part of the measurement
+        started = time.perf_counter()
+        try:
+            response = route.request(client, local, i)
+            response.get_data()  # streamed pages aren't done until the body is read
+            response.close()
+            ok = response.status_code < 400
+            error = None if ok else f"HTTP {response.status_code}"
+        except Exception as e:  # QueryBudgetExceeded and friends surface here under TESTING
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                failures.append(error)
+
+    query_counts.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    counts = list(query_counts)
+
+    return {
+        'requests': total,
+        'errors': len(failures),
+        'first_error': failures[0] if failures else None,
+        'throughput_rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries_per_request': round(sum(counts) / len(counts), 2) if counts else 0.0,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if current['errors']:
+            regressions.append(f"{name}: {current['errors']} failed requests ({current['first_error']})")
+        if not previous:
+            continue
+        for metric in ('p95_ms', 'queries_per_request'):
+            if current[metric] > previous[metric] * (1 + tolerance) + 1e-9:
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]}")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {previous['throughput_rps']} -> "
+                               f"{current['throughput_rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--listings', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="requests per route")
+    parser.add_argument('--routes', nargs='*', help="only run these routes")
+    parser.add_argument('--database', help="seeded SQLite file to reuse (created if missing)")
+    parser.add_argument('--no-response-cache', action='store_true',
+                        help="render every anonymous page instead of serving cached copies")
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed relative regression, e.g. 0.15 for 15%%")
+    args = parser.parse_args()
+
+    database = args.database or os.path.join(
+        tempfile.gettempdir(), f'wazobia-bench-{args.listings}-{args.users}-{args.seed}', 'bench.db'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    app = build_app(os.path.abspath(database), args.listings, args.users, args.seed,
+                    response_cache=not args.no_response_cache)
+
+    query_counts = []
+
+    @app.after_request
+    def record_queries(response):
+        # Streamed pages run most of their SQL after this hook, while the
+        # body is produced; count once the response is closed.
+        request_globals = g._get_current_object()
+        response.call_on_close(
+            lambda: query_counts.append(request_globals.get('sql_query_count', 0)))
+        return response
+
+    routes, sellers = make_routes(app)
+    results = {
+        'meta': {
+            'listings': args.listings, 'users': args.users, 'seed': args.seed,
+            'concurrency': args.concurrency, 'requests': args.requests,
+            'response_cache': not args.no_response_cache,
+            'python': platform.python_version(), 'platform': platform.platform(),
+        },
+        'routes': {},
+    }
+
+    print(f"{'route':>16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'q/req':>6} {'errors':>6}")
+    for route in routes:
+        if args.routes and route.name not in args.routes:
+            continue
+        result = run_route(app, route, sellers, args.concurrency, args.requests, query_counts)
+        results['routes'][route.name] = result
+        print(f"{route.name:>16} {result['throughput_rps']:8.1f} {result['p50_ms']:8.2f} "
+              f"{result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['queries_per_request']:6.2f} {result['errors']:6d}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+    sys.exit(1 if any(r['errors'] for r in results['routes'].values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Nigerian states and the cities sellers most often type, for turning the free
+text in a listing's location field into a (state, city) pair.
+
+    >>> normalize_location("Ikeja")
+    ('Lagos', 'Ikeja')
+    >>> normalize_location("port-harcourt, rivers state")
+    ('Rivers', 'Port Harcourt')
+    >>> normalize_location("Abeokuta, Lagos")   # city not in that state
+    ('Lagos', '')
+
+A state on its own normalizes to (state, ''). Text that names no known
+state or city returns None. Kept free of application imports so migrations
+can use it too.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+NIGERIAN_STATES = (
+    'Abia', 'Adamawa', 'Akwa Ibom', 'Anambra', 'Bauchi', 'Bayelsa', 'Benue',
+    'Borno', 'Cross River', 'Delta', 'Ebonyi', 'Edo', 'Ekiti', 'Enugu', 'FCT',
+    'Gombe', 'Imo', 'Jigawa', 'Kaduna', 'Kano', 'Katsina', 'Kebbi', 'Kogi',
+    'Kwara', 'Lagos', 'Nasarawa', 'Niger', 'Ogun', 'Ondo', 'Osun', 'Oyo',
+    'Plateau', 'Rivers', 'Sokoto', 'Taraba', 'Yobe', 'Zamfara',
+)
+
+STATE_ALIASES = {
+    'abuja fct': 'FCT',
+    'federal capital territory': 'FCT',
+    'f c t': 'FCT',
+    'nassarawa': 'Nasarawa',
+    'akwaibom': 'Akwa Ibom',
+}
+
+# City -> state. Where a state shares its capital's name (Lagos, Kano,
+# Enugu, ...) the state wins, so those capitals aren't listed here.
+CITY_STATES = {
+    'Ikeja': 'Lagos', 'Lekki': 'Lagos', 'Victoria Island': 'Lagos', 'Ikoyi': 'Lagos',
+    'Yaba': 'Lagos', 'Surulere': 'Lagos', 'Ajah': 'Lagos', 'Festac': 'Lagos',
+    'Ikorodu': 'Lagos', 'Maryland': 'Lagos', 'Gbagada': 'Lagos', 'Oshodi': 'Lagos',
+    'Apapa': 'Lagos', 'Agege': 'Lagos', 'Alimosho': 'Lagos', 'Magodo': 'Lagos',
+    'Abuja': 'FCT', 'Garki': 'FCT', 'Wuse': 'FCT', 'Maitama': 'FCT', 'Gwarinpa': 'FCT',
+    'Kubwa': 'FCT', 'Asokoro': 'FCT', 'Lugbe': 'FCT',
+    'Port Harcourt': 'Rivers', 'Obio-Akpor': 'Rivers',
+    'Ibadan': 'Oyo', 'Ogbomosho': 'Oyo',
+    'Abeokuta': 'Ogun', 'Ota': 'Ogun', 'Sagamu': 'Ogun', 'Ijebu Ode': 'Ogun',
+    'Benin City': 'Edo', 'Auchi': 'Edo',
+    'Warri': 'Delta', 'Asaba': 'Delta',
+    'Onitsha': 'Anambra', 'Awka': 'Anambra', 'Nnewi': 'Anambra',
+    'Aba': 'Abia', 'Umuahia': 'Abia',
+    'Owerri': 'Imo',
+    'Uyo': 'Akwa Ibom', 'Calabar': 'Cross River',
+    'Zaria': 'Kaduna', 'Jos': 'Plateau', 'Ilorin': 'Kwara',
+    'Akure': 'Ondo', 'Osogbo': 'Osun', 'Ile-Ife': 'Osun', 'Ado-Ekiti': 'Ekiti',
+    'Makurdi': 'Benue', 'Lokoja': 'Kogi', 'Minna': 'Niger', 'Yola': 'Adamawa',
+    'Maiduguri': 'Borno', 'Yenagoa': 'Bayelsa', 'Abakaliki': 'Ebonyi',
+    'Lafia': 'Nasarawa', 'Nsukka': 'Enugu',
+}
+
+
+def fold(value):
+    """Lowercase, strip accents and punctuation, drop a trailing 'state'."""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    value = re.sub(r'[^a-z0-9,/]+', ' ', value)
+    return re.sub(r'\s+state\b', '', value).strip()
+
+
+_STATES = {fold(name): name for name in NIGERIAN_STATES}
+_STATES.update(STATE_ALIASES)
+_CITIES = {fold(city): (state, city) for city, state in CITY_STATES.items()}
+
+
+def _match(part, lookup):
+    if part in lookup:
+        return lookup[part]
+    # "lekki phase 1", "opposite ikeja city mall": take the longest known
+    # name that appears as whole words.
+    for name in sorted(lookup, key=len, reverse=True):
+        if re.search(rf'\b{re.escape(name)}\b', part):
+            return lookup[name]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def normalize_location(value):
+    """Map free text to (state, city) with city '' for state-level, or None."""
+    parts = [part.strip() for part in re.split(r'[,/]', fold(value)) if part.strip()]
+    state = city = None
+    # Addresses usually run from most to least specific, so look for the
+    # state from the end and the city from the start.
+    for part in reversed(parts):
+        state = _match(part, _STATES)
+        if state:
+            break
+    for part in parts:
+        found = _match(part, _CITIES)
+        if found:
+            city_state, city = found
+            break
+    if city and state is None:
+        state = city_state
+    elif city and city_state != state:
+        city = None
+    if state is None:
+        return None
+    return state, city or ''
@@ -0,0 +1,308 @@
+"""
+Prometheus metrics shared by every worker on a node.
+
+Each process keeps its samples in plain dicts, so recording one is a dict
+update: no lock, no I/O. At most once per ``flush_interval`` the process
+writes a snapshot to ``<directory>/<pid>.json``. A daemon thread picks up
+whatever an idle process recorded after its last flush. Rendering merges every
+snapshot in the directory. Counters and histograms are summed across all
+processes, including workers that have since exited, so totals don't go
+backwards when gunicorn recycles one. Gauges are summed across live
+processes only. Exited workers' snapshots are folded into one archive file
+as they are found, so the directory doesn't grow.
+
+    registry = Registry()
+    registry.configure('/var/run/wazobia/metrics')
+    served = registry.counter('http_requests_total', 'Requests served.', ('endpoint', 'status'))
+    served.inc('home', '200')
+    latency = registry.histogram('http_request_duration_seconds', 'Latency.', ('endpoint',))
+    latency.observe(0.042, 'home')
+    body = registry.render()
+
+Without a directory the registry only reports the current process.
+"""
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE = 'archive.json'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+
+    def merge(self, current, value):
+        return value if current is None else current + value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, value, *labels):
+        """Mirror a cumulative count this process already keeps elsewhere."""
+        self._values[labels] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        # Per-bucket (not cumulative) counts, then the +Inf bucket, then the sum.
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def merge(self, current, value):
+        return list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+
+class Derived:
+    """Computed at render time from the merged samples; never stored."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, compute):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.compute = compute
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self.flush_interval = 1.0
+        self._collectors = []
+        self._flushed_at = 0.0
+        self._dirty = False
+        self._flusher = None
+        # A forked child starts from zero; its parent's samples are already
+        # counted under the parent's pid.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def configure(self, directory, flush_interval=1.0):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def derived(self, name, documentation, labelnames, compute):
+        """`compute(samples)` gets {metric name: {labels: value}} and returns {labels: value}."""
+        return self._register(Derived(name, documentation, labelnames, compute))
+
+    def collector(self, fn):
+        """Register `fn` to run before every snapshot, to copy in state kept elsewhere."""
+        self._collectors.append(fn)
+        return fn
+
+    def _reset(self):
+        for metric in self.metrics.values():
+            if not isinstance(metric, Derived):
+                metric._values.clear()
+        self._flushed_at = 0.0
+        self._dirty = False
+        self._flusher = None
+
+    # -- persistence ---------------------------------------------------------
+
+    def _snapshot(self):
+        for fn in self._collectors:
+            fn()
+        # list() copies in one step, so a concurrent update can't break the iteration.
+        return {name: [[list(labels), list(value) if isinstance(value, list) else value]
+                       for labels, value in list(metric._values.items())]
+                for name, metric in self.metrics.items() if not isinstance(metric, Derived)}
+
+    def maybe_flush(self):
+        """Call after recording: flushes now if the interval has passed, else soon."""
+        if not self.directory:
+            return
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+            return
+        self._dirty = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_pending, daemon=True,
+                                             name='metrics-flush')
+            self._flusher.start()
+
+    def _flush_pending(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                try:
+                    self.flush()
+                except Exception:
+                    pass  # metrics must never take the worker down; try again next tick
+
+    def flush(self):
+        if not self.directory:
+            return
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+        self._write(f'{os.getpid()}.json', self._snapshot())
+
+    def _write(self, filename, snapshot):
+        path = os.path.join(self.directory, filename)
+        with open(f'{path}.{os.getpid()}.tmp', 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+        os.replace(f'{path}.{os.getpid()}.tmp', path)
+
+    def _read(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _merge_into(self, merged, snapshot, include_gauges):
+        for name, samples in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.kind == 'gauge' and not include_gauges):
+                continue
+            values = merged.setdefault(name, {})
+            for labels, value in samples:
+                labels = tuple(labels)
+                values[labels] = metric.merge(values.get(labels), value)
+
+    def _fold_exited(self, pids):
+        """Add exited processes' counters to the archive and remove their files."""
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = {}
+            self._merge_into(archive, self._read(ARCHIVE), include_gauges=False)
+            folded = False
+            for pid in pids:
+                filename = f'{pid}.json'
+                if not os.path.exists(os.path.join(self.directory, filename)):
+                    continue  # another process folded it first
+                self._merge_into(archive, self._read(filename), include_gauges=False)
+                folded = True
+            if folded:
+                self._write(ARCHIVE, {name: [[list(labels), value] for labels, value in values.items()]
+                                      for name, values in archive.items()})
+                for pid in pids:
+                    try:
+                        os.remove(os.path.join(self.directory, f'{pid}.json'))
+                    except FileNotFoundError:
+                        pass
+
+    def collect(self):
+        """Every process's samples merged: {metric name: {labels: value}}."""
+        if not self.directory:
+            merged = {}
+            self._merge_into(merged, self._snapshot(), include_gauges=True)
+            return merged
+        self.flush()
+        pids = [int(name[:-5]) for name in os.listdir(self.directory)
+                if name.endswith('.json') and name[:-5].isdigit()]
+        exited = [pid for pid in pids if not _alive(pid)]
+        if exited:
+            self._fold_exited(exited)
+        merged = {}
+        self._merge_into(merged, self._read(ARCHIVE), include_gauges=False)
+        for pid in pids:
+            if pid not in exited:
+                self._merge_into(merged, self._read(f'{pid}.json'), include_gauges=True)
+        return merged
+
+    # -- exposition ----------------------------------------------------------
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        samples = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            values = (metric.compute(samples) if isinstance(metric, Derived)
+                      else samples.get(name, {}))
+            lines.append(f'# HELP {name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(values.items()):
+                if metric.kind == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), value):
+                        cumulative += count
+                        le = _labels(metric.labelnames, labels, (('le', _number(bound)),))
+                        lines.append(f'{name}_bucket{le} {_number(cumulative)}')
+                    plain = _labels(metric.labelnames, labels)
+                    lines.append(f'{name}_sum{plain} {_number(value[-1])}')
+                    lines.append(f'{name}_count{plain} {_number(cumulative)}')
+                else:
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape_help(text):
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
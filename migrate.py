@@ -1,8 +1,8 @@
-from app import create_app, db
-from flask_migrate import Migrate
+from app import get_app
 
-app = create_app()
-migrate = Migrate(app, db)
+# For `FLASK_APP=migrate.py flask db ...`. create_app() already sets up
+# Flask-Migrate for CLI runs, so this only has to build the one app.
+app = get_app()
 
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    app.run()
@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -51,6 +52,28 @@ def get_metadata():
     return target_db.metadata
 
 
+LISTING_PARTITION = re.compile(r'listings_(p\d{4}_\d{2}|default)')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Leave autogenerate's hands off the full-text search objects. The models
+    don't declare them: they come from app.SEARCH_DDL and the 8f4a2d61c0b9
+    migration, and without this every `flask db migrate` would drop them.
+    The same goes for the monthly listings partitions on PostgreSQL, which
+    `flask maintain-listings` creates and drops as the months go by.
+    """
+    if type_ == 'table' and reflected and name.startswith('listings_fts'):
+        return False
+    if type_ == 'table' and reflected and LISTING_PARTITION.fullmatch(name):
+        return False
+    if type_ == 'column' and name == 'search_vector' and object.table.name == 'listings':
+        return False
+    if type_ == 'index' and name == 'ix_listings_search_vector':
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +88,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +117,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,26 @@
+"""Composite index for the keyset-paginated listings feed
+
+Revision ID: 3c1f0b7d92ae
+Revises: a5e7df3b0764
+Create Date: 2026-10-17 09:12:40.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f0b7d92ae'
+down_revision = 'a5e7df3b0764'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.create_index('ix_listings_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.drop_index('ix_listings_created_at_id')
@@ -0,0 +1,101 @@
+"""Full-text search over listing title and description
+
+Revision ID: 8f4a2d61c0b9
+Revises: 3c1f0b7d92ae
+Create Date: 2026-10-17 11:40:02.534810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4a2d61c0b9'
+down_revision = '3c1f0b7d92ae'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION listings_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+POSTGRES_BACKFILL = """
+UPDATE listings SET search_vector =
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'B')
+WHERE id > :low AND id <= :high
+"""
+
+SQLITE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title, description ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def _id_batches(bind):
+    max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM listings")).scalar()
+    for low in range(0, max_id, BATCH_SIZE):
+        yield {'low': low, 'high': low + BATCH_SIZE}
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE listings ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        op.execute(POSTGRES_FUNCTION)
+        op.execute("DROP TRIGGER IF EXISTS listings_search_vector_trg ON listings")
+        op.execute(
+            "CREATE TRIGGER listings_search_vector_trg BEFORE INSERT OR UPDATE OF title, description "
+            "ON listings FOR EACH ROW EXECUTE FUNCTION listings_search_vector_update()"
+        )
+        # Backfill outside the migration transaction so each batch commits on
+        # its own and row locks are held only briefly.
+        with op.get_context().autocommit_block():
+            for batch in _id_batches(bind):
+                bind.execute(sa.text(POSTGRES_BACKFILL), batch)
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_search_vector "
+                "ON listings USING GIN (search_vector)"
+            )
+    elif bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5("
+            "title, description, content='listings', content_rowid='id', "
+            "tokenize='porter unicode61 remove_diacritics 2')"
+        )
+        for statement in SQLITE_TRIGGERS:
+            op.execute(statement)
+        for batch in _id_batches(bind):
+            bind.execute(sa.text(
+                "INSERT INTO listings_fts(rowid, title, description) "
+                "SELECT id, title, description FROM listings WHERE id > :low AND id <= :high"
+            ), batch)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_listings_search_vector")
+        op.execute("DROP TRIGGER IF EXISTS listings_search_vector_trg ON listings")
+        op.execute("DROP FUNCTION IF EXISTS listings_search_vector_update()")
+        op.execute("ALTER TABLE listings DROP COLUMN IF EXISTS search_vector")
+    elif bind.dialect.name == 'sqlite':
+        for name in ('listings_fts_ai', 'listings_fts_ad', 'listings_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS listings_fts")
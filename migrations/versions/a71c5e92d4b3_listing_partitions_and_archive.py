@@ -0,0 +1,137 @@
+"""Monthly listing partitions on PostgreSQL and an archive table for expired ads
+
+Revision ID: a71c5e92d4b3
+Revises: f2b84c1e7a39
+Create Date: 2026-10-17 23:05:41.270913
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a71c5e92d4b3'
+down_revision = 'f2b84c1e7a39'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+# Everything a rebuilt listings table needs, as it stood at f2b84c1e7a39.
+INDEXES = (
+    ('ix_listings_title', 'btree (title)'),
+    ('ix_listings_created_at_id', 'btree (created_at, id)'),
+    ('ix_listings_category_id_price_kobo', 'btree (category_id, price_kobo, id)'),
+    ('ix_listings_price_kobo_id', 'btree (price_kobo, id)'),
+    ('ix_listings_category_id_location_id_created_at',
+     'btree (category_id, location_id, created_at DESC, id DESC)'),
+    ('ix_listings_category_id_created_at', 'btree (category_id, created_at DESC, id DESC)'),
+    ('ix_listings_location_id_created_at', 'btree (location_id, created_at DESC, id DESC)'),
+    ('ix_listings_search_vector', 'gin (search_vector)'),
+)
+
+FOREIGN_KEYS = (
+    ('listings_category_id_fkey', 'category_id', 'categories'),
+    ('listings_user_id_fkey', 'user_id', 'users'),
+    ('fk_listings_location_id_locations', 'location_id', 'locations'),
+)
+
+SEARCH_TRIGGER = (
+    "CREATE TRIGGER listings_search_vector_trg BEFORE INSERT OR UPDATE OF title, description "
+    "ON listings FOR EACH ROW EXECUTE FUNCTION listings_search_vector_update()"
+)
+
+ARCHIVE_COLUMNS = ('id, title, price, price_kobo, description, location, location_id, '
+                   'phone, category_id, user_id, created_at')
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _finish_listings(primary_key):
+    """Constraints, indexes and the search trigger for a freshly swapped-in listings."""
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY listings.id")
+    op.execute(f"ALTER TABLE listings ADD CONSTRAINT listings_pkey PRIMARY KEY ({primary_key})")
+    for name, column, target in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE listings ADD CONSTRAINT {name} "
+                   f"FOREIGN KEY ({column}) REFERENCES {target} (id)")
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON listings USING {definition}")
+    op.execute(SEARCH_TRIGGER)
+
+
+def _partition_listings(bind):
+    # The partition key has to be part of the primary key, so it can't be NULL.
+    op.execute("UPDATE listings SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL")
+    op.execute("CREATE TABLE listings_partitioned (LIKE listings INCLUDING DEFAULTS) "
+               "PARTITION BY RANGE (created_at)")
+
+    this_month = _add_months(datetime.utcnow(), 0)
+    oldest, newest = bind.execute(sa.text(
+        "SELECT date_trunc('month', min(created_at)), date_trunc('month', max(created_at)) FROM listings"
+    )).first()
+    month = min(oldest or this_month, this_month)
+    last = _add_months(max(newest or this_month, this_month), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"CREATE TABLE listings_p{month:%Y_%m} PARTITION OF listings_partitioned "
+                   f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')")
+        month = _add_months(month, 1)
+    # Catches rows for months nobody has created a partition for yet, so a
+    # missed maintenance run can't make inserts fail. The cost: newest-first
+    # scans merge the partitions' indexes instead of reading them in order.
+    op.execute("CREATE TABLE listings_default PARTITION OF listings_partitioned DEFAULT")
+
+    op.execute("INSERT INTO listings_partitioned SELECT * FROM listings")
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE listings")
+    op.execute("ALTER TABLE listings_partitioned RENAME TO listings")
+    _finish_listings('id, created_at')
+
+
+def _unpartition_listings():
+    op.execute("CREATE TABLE listings_plain (LIKE listings INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO listings_plain SELECT * FROM listings")
+    op.execute("ALTER SEQUENCE listings_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE listings")  # takes every partition with it
+    op.execute("ALTER TABLE listings_plain RENAME TO listings")
+    op.execute("ALTER TABLE listings ALTER COLUMN created_at DROP NOT NULL")
+    _finish_listings('id')
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_table('listings_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(length=100), nullable=False),
+        sa.Column('price', sa.String(length=20), nullable=True),
+        sa.Column('price_kobo', sa.BigInteger(), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('location', sa.String(length=50), nullable=True),
+        sa.Column('location_id', sa.Integer(), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['location_id'], ['locations.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    if bind.dialect.name == 'postgresql':
+        _partition_listings(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _unpartition_listings()
+    # Archived ads go back to being live rather than being lost.
+    op.execute(f"INSERT INTO listings ({ARCHIVE_COLUMNS}) SELECT {ARCHIVE_COLUMNS} FROM listings_archive")
+    op.execute("UPDATE categories SET listing_count = "
+               "(SELECT count(*) FROM listings WHERE listings.category_id = categories.id)")
+    op.drop_table('listings_archive')
@@ -0,0 +1,38 @@
+"""Category hierarchy and maintained listing counts
+
+Revision ID: b27e95d4f013
+Revises: 8f4a2d61c0b9
+Create Date: 2026-10-17 14:05:51.902316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27e95d4f013'
+down_revision = '8f4a2d61c0b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('listing_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_categories_parent_id'), ['parent_id'], unique=False)
+        batch_op.create_foreign_key('fk_categories_parent_id', 'categories', ['parent_id'], ['id'])
+
+    # Categories are a handful of rows, so one correlated UPDATE is enough.
+    op.execute(
+        "UPDATE categories SET listing_count = "
+        "(SELECT count(*) FROM listings WHERE listings.category_id = categories.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('categories', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_categories_parent_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_categories_parent_id'))
+        batch_op.drop_column('listing_count')
+        batch_op.drop_column('parent_id')
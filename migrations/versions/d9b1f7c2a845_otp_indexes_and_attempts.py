@@ -0,0 +1,30 @@
+"""Index OTP lookups and count verification attempts
+
+Revision ID: d9b1f7c2a845
+Revises: c4d8a3e1f627
+Create Date: 2026-10-17 18:47:33.260914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b1f7c2a845'
+down_revision = 'c4d8a3e1f627'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('otp_verifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_otp_verifications_user_id_used', ['user_id', 'used'], unique=False)
+        batch_op.create_index(batch_op.f('ix_otp_verifications_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('otp_verifications', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_otp_verifications_expires_at'))
+        batch_op.drop_index('ix_otp_verifications_user_id_used')
+        batch_op.drop_column('attempts')
@@ -0,0 +1,109 @@
+"""Numeric listing prices for range filters and price sorting
+
+Revision ID: e3a6c90b5d18
+Revises: d9b1f7c2a845
+Create Date: 2026-10-17 20:12:48.903117
+
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a6c90b5d18'
+down_revision = 'd9b1f7c2a845'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# The full-text search triggers from 8f4a2d61c0b9, which SQLite loses
+# whenever batch mode rebuilds listings.
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title, description ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+# A frozen copy of app.parse_price, so this revision keeps producing the same
+# values however the application code changes later.
+PRICE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(k|m|thousand|million)?')
+PRICE_MULTIPLIERS = {None: 1, 'k': 1_000, 'thousand': 1_000, 'm': 1_000_000, 'million': 1_000_000}
+
+
+def parse_price(value):
+    if value is None:
+        return None
+    text_value = str(value).strip().lower().replace(',', '').replace(' ', '')
+    for prefix in ('₦', 'ngn', 'naira', 'n'):
+        if text_value.startswith(prefix):
+            text_value = text_value[len(prefix):]
+            break
+    match = PRICE_PATTERN.fullmatch(text_value)
+    if not match:
+        return None
+    try:
+        amount = Decimal(match.group(1)) * PRICE_MULTIPLIERS[match.group(2)]
+    except InvalidOperation:
+        return None
+    return int((amount * 100).to_integral_value())
+
+
+def _backfill(bind):
+    max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM listings")).scalar()
+    for low in range(0, max_id, BATCH_SIZE):
+        rows = bind.execute(sa.text(
+            "SELECT id, price FROM listings WHERE id > :low AND id <= :high AND price IS NOT NULL"
+        ), {'low': low, 'high': low + BATCH_SIZE}).fetchall()
+        updates = [{'id': row.id, 'price_kobo': parse_price(row.price)} for row in rows]
+        updates = [update for update in updates if update['price_kobo'] is not None]
+        if updates:
+            bind.execute(sa.text("UPDATE listings SET price_kobo = :price_kobo WHERE id = :id"), updates)
+
+
+def upgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('price_kobo', sa.BigInteger(), nullable=True))
+
+    if bind.dialect.name == 'postgresql':
+        # Each batch commits on its own and the indexes build without
+        # blocking writes, as in the full-text search migration.
+        with op.get_context().autocommit_block():
+            _backfill(bind)
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_category_id_price_kobo "
+                "ON listings (category_id, price_kobo, id)"
+            )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_price_kobo_id "
+                "ON listings (price_kobo, id)"
+            )
+    else:
+        _backfill(bind)
+        with op.batch_alter_table('listings', schema=None) as batch_op:
+            batch_op.create_index('ix_listings_category_id_price_kobo',
+                                  ['category_id', 'price_kobo', 'id'], unique=False)
+            batch_op.create_index('ix_listings_price_kobo_id', ['price_kobo', 'id'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.drop_index('ix_listings_price_kobo_id')
+        batch_op.drop_index('ix_listings_category_id_price_kobo')
+        batch_op.drop_column('price_kobo')
+    if bind.dialect.name == 'sqlite':
+        # Dropping the column rebuilt listings without its search triggers.
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
+        op.execute("INSERT INTO listings_fts(listings_fts) VALUES('rebuild')")
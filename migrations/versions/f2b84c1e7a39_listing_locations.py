@@ -0,0 +1,122 @@
+"""Normalized listing locations and category/location/recency indexes
+
+Revision ID: f2b84c1e7a39
+Revises: e3a6c90b5d18
+Create Date: 2026-10-17 21:34:10.582264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from locations import normalize_location
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b84c1e7a39'
+down_revision = 'e3a6c90b5d18'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+INDEXES = (
+    ('ix_listings_category_id_location_id_created_at',
+     'category_id, location_id, created_at DESC, id DESC'),
+    ('ix_listings_category_id_created_at', 'category_id, created_at DESC, id DESC'),
+    ('ix_listings_location_id_created_at', 'location_id, created_at DESC, id DESC'),
+)
+
+# Rebuilding listings under SQLite batch mode drops the full-text search
+# triggers from 8f4a2d61c0b9 along with the old table; put them back.
+SQLITE_SEARCH_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF title, description ON listings BEGIN "
+    "INSERT INTO listings_fts(listings_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO listings_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def _restore_search_triggers(bind):
+    if bind.dialect.name != 'sqlite':
+        return
+    for statement in SQLITE_SEARCH_TRIGGERS:
+        op.execute(statement)
+    # Catch up on anything written while the triggers were missing.
+    op.execute("INSERT INTO listings_fts(listings_fts) VALUES('rebuild')")
+
+
+def _location_ids(bind):
+    """Create a row for every place named in listings.location; map text -> id."""
+    texts = [row[0] for row in bind.execute(sa.text(
+        "SELECT DISTINCT location FROM listings WHERE location IS NOT NULL"
+    ))]
+    keys = {text: normalize_location(text) for text in texts}
+    wanted = set(key for key in keys.values() if key)
+    wanted |= {(state, '') for state, _ in wanted}
+    existing = {(row.state, row.city): row.id for row in bind.execute(
+        sa.text("SELECT id, state, city FROM locations")
+    )}
+    for state, city in sorted(wanted - set(existing)):
+        bind.execute(sa.text("INSERT INTO locations (state, city) VALUES (:state, :city)"),
+                     {'state': state, 'city': city})
+    ids = {(row.state, row.city): row.id for row in bind.execute(
+        sa.text("SELECT id, state, city FROM locations")
+    )}
+    return {text: ids[key] for text, key in keys.items() if key}
+
+
+def _backfill(bind):
+    location_ids = _location_ids(bind)
+    max_id = bind.execute(sa.text("SELECT coalesce(max(id), 0) FROM listings")).scalar()
+    for low in range(0, max_id, BATCH_SIZE):
+        rows = bind.execute(sa.text(
+            "SELECT id, location FROM listings WHERE id > :low AND id <= :high"
+        ), {'low': low, 'high': low + BATCH_SIZE}).fetchall()
+        updates = [{'id': row.id, 'location_id': location_ids[row.location]}
+                   for row in rows if row.location in location_ids]
+        if updates:
+            bind.execute(sa.text("UPDATE listings SET location_id = :location_id WHERE id = :id"), updates)
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_table('locations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(length=50), nullable=False),
+        sa.Column('city', sa.String(length=80), server_default='', nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('state', 'city', name='uq_locations_state_city')
+    )
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('location_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_listings_location_id_locations', 'locations',
+                                    ['location_id'], ['id'])
+    _restore_search_triggers(bind)
+
+    if bind.dialect.name == 'postgresql':
+        # Batches commit one at a time and the indexes build without taking
+        # a write lock on listings.
+        with op.get_context().autocommit_block():
+            _backfill(bind)
+            for name, columns in INDEXES:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON listings ({columns})")
+    else:
+        _backfill(bind)
+        for name, columns in INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON listings ({columns})")
+
+
+def downgrade():
+    bind = op.get_bind()
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    with op.batch_alter_table('listings', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_listings_location_id_locations', type_='foreignkey')
+        batch_op.drop_column('location_id')
+    _restore_search_triggers(bind)
+    op.drop_table('locations')
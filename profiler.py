@@ -0,0 +1,277 @@
+"""
+On-demand request profiling without extra dependencies.
+
+A Sampler records the Python stack of one request every ``interval``
+seconds from a real OS thread, so it keeps sampling while the request is
+blocked on the database. Under gevent it follows the request's greenlet
+rather than the OS thread, since greenlets take turns on that thread.
+Samples are kept as collapsed stacks (``root;caller;callee`` -> count).
+
+Captures are JSON files in a directory that holds at most ``max_captures``
+of them; the oldest go first. They can be exported as collapsed stacks
+(flamegraph.pl, speedscope, inferno) or as speedscope's own format.
+
+    sampler = Sampler(interval=0.005).start()
+    ...  # handle the request
+    sampler.stop()
+    store = CaptureStore('/var/cache/wazobia/profiles', max_captures=200)
+    capture_id = store.save({'path': '/', 'stacks': sampler.stacks, ...})
+"""
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from collections import Counter
+from functools import lru_cache
+import _thread
+
+
+def _os_thread_tools():
+    """start_new_thread, get_ident, allocate_lock and sleep for real OS threads, even under gevent."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        monkey = None
+    if monkey is not None and monkey.is_module_patched('threading'):
+        return (monkey.get_original('_thread', 'start_new_thread'),
+                monkey.get_original('_thread', 'get_ident'),
+                monkey.get_original('_thread', 'allocate_lock'),
+                monkey.get_original('time', 'sleep'))
+    return _thread.start_new_thread, _thread.get_ident, _thread.allocate_lock, time.sleep
+
+
+def _current_greenlet():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return None
+    if not monkey.is_module_patched('threading'):
+        return None
+    import greenlet
+    return greenlet.getcurrent()
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename):
+    for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def frame_name(code):
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Sampler:
+    """Wall-clock stack sampler for the thread (or greenlet) that creates it."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        start_new_thread, get_ident, allocate_lock, self._sleep = _os_thread_tools()
+        self._start_new_thread = start_new_thread
+        self._thread_id = get_ident()
+        self._greenlet = _current_greenlet()
+        self._finished = allocate_lock()
+        self._stopping = False
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._finished.acquire()
+        self._start_new_thread(self._run, ())
+        return self
+
+    def _frame(self):
+        if self._greenlet is not None:
+            if self._greenlet.dead:
+                return None
+            # A suspended greenlet (waiting on a socket, say) keeps its
+            # frame here; a running one is the OS thread's current frame.
+            if self._greenlet.gr_frame is not None:
+                return self._greenlet.gr_frame
+        return sys._current_frames().get(self._thread_id)
+
+    def _run(self):
+        try:
+            while not self._stopping:
+                self._sleep(self.interval)
+                frame = self._frame()
+                if frame is not None and not self._stopping:
+                    self.stacks[collapse(frame)] += 1
+                    self.samples += 1
+                del frame
+        finally:
+            self._finished.release()
+
+    def stop(self):
+        if self._stopping:
+            return self
+        self._stopping = True
+        # Bounded by one interval; after this the stacks are no longer written to.
+        self._finished.acquire(timeout=max(1.0, self.interval * 10))
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+
+class RequestTrace:
+    """SQL run by one request, kept until its body has finished streaming."""
+
+    def __init__(self, max_queries=200, max_statement=2000):
+        self.queries = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.max_queries = max_queries
+        self.max_statement = max_statement
+
+    def add_query(self, statement, seconds):
+        self.query_count += 1
+        self.query_seconds += seconds
+        if len(self.queries) < self.max_queries:
+            self.queries.append({'statement': statement[:self.max_statement],
+                                 'ms': round(seconds * 1000, 3)})
+
+
+class CaptureStore:
+    """A directory of at most `max_captures` JSON captures, oldest dropped first."""
+
+    def __init__(self, directory=None, max_captures=200):
+        self.directory = directory
+        self.max_captures = max_captures
+        self._sequence = 0
+
+    def configure(self, directory, max_captures=200):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_captures = max_captures
+
+    def new_id(self):
+        """Ids sort by time, so the newest captures are the ones kept."""
+        self._sequence += 1
+        return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}-{self._sequence}"
+
+    def save(self, capture, capture_id=None):
+        capture_id = capture_id or self.new_id()
+        capture = dict(capture, id=capture_id)
+        path = os.path.join(self.directory, f'{capture_id}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(capture, f, separators=(',', ':'))
+        os.replace(f'{path}.tmp', path)
+        self._prune()
+        return capture_id
+
+    def ids(self):
+        """Capture ids, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+    def _prune(self):
+        for capture_id in self.ids()[self.max_captures:]:
+            try:
+                os.remove(os.path.join(self.directory, f'{capture_id}.json'))
+            except FileNotFoundError:
+                pass  # another worker got there first
+
+    def load(self, capture_id):
+        """The capture with this id (or unique id prefix), or None."""
+        matches = [i for i in self.ids() if i == capture_id] or \
+                  [i for i in self.ids() if i.startswith(capture_id)]
+        if len(matches) != 1:
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{matches[0]}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def breakdown(stacks, categories):
+    """Samples per category: the innermost frame matching a category's patterns decides."""
+    totals = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        for name in reversed(frames):
+            category = next((category for category, patterns in categories
+                             if any(pattern in name for pattern in patterns)), None)
+            if category:
+                break
+        totals[category or 'python'] += count
+    return totals
+
+
+def self_time(stacks):
+    """Samples per leaf frame."""
+    totals = Counter()
+    for stack, count in stacks.items():
+        totals[stack.rsplit(';', 1)[-1]] += count
+    return totals
+
+
+def to_collapsed(stacks):
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+def to_speedscope(capture):
+    """A speedscope 'sampled' profile (https://www.speedscope.app/file-format-schema.json)."""
+    frames, index = [], {}
+    samples, weights = [], []
+    interval_ms = capture.get('interval_ms', 1)
+    for stack, count in capture.get('stacks', {}).items():
+        sample = []
+        for name in stack.split(';'):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({'name': name})
+            sample.append(index[name])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+    name = f"{capture.get('method', '')} {capture.get('path', '')}".strip() or capture.get('id', '')
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': name, 'unit': 'milliseconds',
+            'startValue': 0, 'endValue': sum(weights),
+            'samples': samples, 'weights': weights,
+        }],
+    }
+
+
+def make_token(secret, ttl):
+    """Header value that turns profiling on for requests made in the next `ttl` seconds."""
+    expires = str(int(time.time() + ttl))
+    return f"{expires}.{_sign(secret, expires)}"
+
+
+def verify_token(secret, value):
+    if not value or '.' not in value:
+        return False
+    expires, signature = value.split('.', 1)
+    # isdigit() alone accepts '²' and friends, which int() rejects.
+    if not (expires.isascii() and expires.isdigit()) or int(expires) < time.time():
+        return False
+    # Bytes, so a signature with non-ASCII characters is a mismatch rather than a TypeError.
+    return hmac.compare_digest(signature.encode('utf-8', 'surrogateescape'),
+                               _sign(secret, expires).encode())
+
+
+def _sign(secret, expires):
+    return hmac.new(secret.encode(), f"profile:{expires}".encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,140 @@
+"""
+Rate-limit storage shared by every worker on a node.
+
+Flask-Limiter's ``memory://`` storage keeps a separate set of counters in
+each gunicorn worker, so with four workers a "5 per minute" limit really
+allows twenty, and the per-key dictionaries grow with every client seen.
+This backend keeps fixed-window counters in one WAL-mode SQLite file
+instead: all workers on the host see the same counts, and no external
+service is needed.
+
+Importing this module registers the ``sqlite://`` scheme with ``limits``:
+
+    RATELIMIT_STORAGE_URI = "sqlite:////var/run/wazobia/ratelimit.db"
+    RATELIMIT_STORAGE_OPTIONS = {"max_keys": 100000}
+
+The table holds at most ``max_keys`` rows. Keys whose window has passed are
+purged every ``purge_interval`` seconds; if the table is still over its cap,
+the keys closest to expiry go first. Requires SQLite 3.35+ (RETURNING).
+"""
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS rate_limits ("
+    " key TEXT PRIMARY KEY,"
+    " count INTEGER NOT NULL,"
+    " expires_at REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at ON rate_limits (expires_at)",
+)
+
+# One statement, so concurrent workers can never lose an increment: a live
+# window is bumped, an expired one is restarted at `amount`.
+INCR = (
+    "INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at) "
+    "ON CONFLICT(key) DO UPDATE SET "
+    " count = CASE WHEN rate_limits.expires_at <= :now THEN :amount"
+    " ELSE rate_limits.count + :amount END,"
+    " expires_at = CASE WHEN rate_limits.expires_at <= :now THEN :expires_at"
+    " ELSE rate_limits.expires_at END "
+    "RETURNING count"
+)
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window rate-limit counters in a shared SQLite file."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri, wrap_exceptions=False, max_keys=100_000,
+                 purge_interval=30, busy_timeout=5.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = urlparse(uri).path
+        # sqlite:////abs/path -> /abs/path, sqlite:///rel/path -> rel/path
+        self.path = path[1:] if path.startswith('//') else path.lstrip('/') or ':memory:'
+        self.max_keys = int(max_keys)
+        self.purge_interval = float(purge_interval)
+        self.busy_timeout = float(busy_timeout)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._next_purge = 0.0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # Connections must not cross a fork; gunicorn workers each open their own.
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _maybe_purge(self, conn, now):
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT count(*) FROM rate_limits").fetchone()[0] - self.max_keys
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM rate_limits WHERE key IN "
+                "(SELECT key FROM rate_limits ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            self._maybe_purge(conn, now)
+            row = conn.execute(INCR, {
+                'key': key, 'amount': amount, 'now': now, 'expires_at': now + expiry,
+            }).fetchone()
+        return row[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            with self._lock:
+                self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self._lock:
+            return self._connection().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        with self._lock:
+            self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))